@@ -0,0 +1,218 @@
+"""Synthetic init_data generator for load testing (flask --app src.app generate-dataset)
+Kept out of src/app.py - nothing here runs while the app serves requests.
+"""
+from datetime import date, datetime, timedelta
+from json import dump
+from random import Random
+from uuid import UUID
+
+from src.app import Student
+
+
+class DatasetGenerator():
+    """Synthetic catalog / student dataset in the init_data JSON format, for load testing at production scale
+    Everything comes from one seeded Random, so the same arguments always produce the same files. Class ids only exist
+    once the database assigns them, so registrations, carts and transactions refer to a class by its key
+    (course_id, semester, location, professor) and Student.init_database_students looks the id up after insert.
+    """
+
+    CATALOGS = {
+        'ACCT': 'Accounting', 'ANTH': 'Anthropology', 'ARTH': 'Art History', 'ARTS': 'Studio Art', 'ASTR': 'Astronomy',
+        'BIOL': 'Biology', 'BMGT': 'Business Management', 'CHEM': 'Chemistry', 'CMIT': 'Information Technology',
+        'CMSC': 'Computer Science', 'COMM': 'Communication', 'CRIM': 'Criminology', 'CYBR': 'Cybersecurity',
+        'DATA': 'Data Science', 'ECON': 'Economics', 'EDUC': 'Education', 'ENGL': 'English', 'ENGR': 'Engineering',
+        'ENVS': 'Environmental Science', 'FINC': 'Finance', 'GEOG': 'Geography', 'GERO': 'Gerontology', 'HIST': 'History',
+        'HMGT': 'Hospitality Management', 'HRMN': 'Human Resources', 'JAPN': 'Japanese', 'LGST': 'Legal Studies',
+        'MATH': 'Mathematics', 'MRKT': 'Marketing', 'MUSC': 'Music', 'NURS': 'Nursing', 'NUTR': 'Nutrition',
+        'PHIL': 'Philosophy', 'PHYS': 'Physics', 'PSYC': 'Psychology', 'SOCY': 'Sociology', 'SPAN': 'Spanish',
+        'SPCH': 'Speech', 'STAT': 'Statistics', 'WRTG': 'Writing',
+    }
+    TOPICS = ['Foundations', 'Principles', 'Methods', 'Theory', 'Applications', 'Analysis', 'Design', 'Systems', 'Practice',
+              'Research', 'Ethics', 'Policy', 'Modeling', 'Topics', 'Seminar', 'Workshop', 'Laboratory', 'Perspectives',
+              'Management', 'Communication', 'Technology', 'Data', 'Culture', 'Leadership']
+    LEVELS = {100: 'Introduction to', 200: 'Intermediate', 300: 'Advanced', 400: 'Senior'}
+    LEVEL_WEIGHTS = {100: 4, 200: 3, 300: 2, 400: 1}
+    LOCATIONS = ['Online', 'Maryland', 'Texas', 'Campus Gym', 'Virginia', 'Europe', 'Asia', 'Hybrid']
+    TITLES = ['Dr.', 'Prof.']
+    SURNAMES = ['Mario', 'Luigi', 'Peach', 'Daisy', 'Toad', 'Yoshi', 'Koopa', 'Bowser', 'Rosalina', 'Wario', 'Waluigi',
+                'Birdo', 'Kamek', 'Pauline', 'Toadette', 'Shy', 'Boo', 'Goomba', 'Lakitu', 'Bob-omb', 'Chomp', 'Dixie',
+                'Diddy', 'Cranky', 'Funky', 'Candy', 'Link', 'Zelda', 'Impa', 'Epona', 'Navi', 'Saria', 'Samus', 'Ridley']
+    FIRST_NAMES = ['alex', 'sam', 'jordan', 'taylor', 'casey', 'riley', 'morgan', 'jamie', 'avery', 'quinn', 'devon',
+                   'harper', 'rowan', 'emerson', 'sage', 'reese', 'skyler', 'kai', 'parker', 'drew', 'maria', 'jose',
+                   'wei', 'aisha', 'fatima', 'ivan', 'olga', 'kofi', 'amara', 'hiro', 'yuki', 'priya', 'arjun', 'chen']
+    LAST_NAMES = ['smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'rodriguez', 'martinez',
+                  'hernandez', 'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor', 'moore', 'jackson', 'martin',
+                  'lee', 'perez', 'thompson', 'white', 'harris', 'sanchez', 'clark', 'ramirez', 'lewis', 'robinson',
+                  'nguyen', 'kim', 'patel', 'okafor', 'mensah', 'kowalski', 'ivanova', 'tanaka', 'singh', 'cohen']
+    # Same calendar as initial_semester_dates.json
+    TERMS = (('Spring', (3, 20), (6, 19)), ('Summer', (6, 20), (9, 21)), ('Fall', (9, 22), (12, 20)))
+
+    def __init__(self, seed=495, courses=2000, students=100000, first_year=None, years=4):
+        self.seed = seed
+        self.random = Random(seed)
+        self.course_count = courses
+        self.student_count = students
+        self.first_year = first_year if first_year is not None else date.today().year - years // 2
+        self.years = years
+
+    def generate_semesters(self):
+        semesters = []
+        for year in range(self.first_year, self.first_year + self.years):
+            for term, (start_month, start_day), (end_month, end_day) in DatasetGenerator.TERMS:
+                semesters.append({
+                    "semester_name": f"{term} {year}",
+                    "start_date": f"{start_month}/{start_day}/{year}",
+                    "end_date": f"{end_month}/{end_day}/{year}"
+                })
+        return semesters
+
+    def generate_courses(self, semester_names):
+        """Courses spread over every catalog and level, with prerequisite chains inside (and sometimes across) catalogs"""
+        random = self.random
+        faculty_pools = {catalog: [f"{random.choice(DatasetGenerator.TITLES)} {random.choice(DatasetGenerator.SURNAMES)} {catalog.title()}{number}"
+                                   for number in range(1, 9)] for catalog in DatasetGenerator.CATALOGS}
+        catalogs = list(DatasetGenerator.CATALOGS)
+        next_numbers = {(catalog, level): level + 1 for catalog in catalogs for level in DatasetGenerator.LEVELS}
+        courses_by_level = {(catalog, level): [] for catalog in catalogs for level in DatasetGenerator.LEVELS}
+        courses = []
+        # Fewer courses at every level up; a catalog level is full after 99 course numbers
+        while len(courses) < self.course_count and next_numbers:
+            open_levels = list(next_numbers)
+            catalog, level = random.choices(open_levels, weights=[DatasetGenerator.LEVEL_WEIGHTS[level] for catalog, level in open_levels])[0]
+            course_number = next_numbers[(catalog, level)]
+            if course_number == level + 99:
+                del next_numbers[(catalog, level)]
+            else:
+                next_numbers[(catalog, level)] += 1
+            course_id = f"{catalog}{course_number}"
+
+            prereqs = []
+            lower_courses = [course for lower_level in DatasetGenerator.LEVELS if lower_level < level for course in courses_by_level[(catalog, lower_level)]]
+            if lower_courses:
+                prereqs = random.sample(lower_courses, min(len(lower_courses), random.choice([1, 1, 1, 2])))
+            if level >= 200 and random.random() < 0.1:
+                other_catalog = random.choice(catalogs)
+                if courses_by_level[(other_catalog, 100)] and other_catalog != catalog:
+                    prereqs.append(random.choice(courses_by_level[(other_catalog, 100)]))
+            courses_by_level[(catalog, level)].append(course_id)
+
+            subject = DatasetGenerator.CATALOGS[catalog]
+            topic = random.choice(DatasetGenerator.TOPICS)
+            courses.append({
+                "catalog": catalog,
+                "course_number": course_number,
+                "course_name": f"{DatasetGenerator.LEVELS[level]} {subject} {topic}"[:250],
+                "description": f"{topic} in {subject.lower()} at the {level}-level."[:250],
+                "max_seats": random.choice([15, 20, 25, 30, 40, 50, 75, 100, 150]),
+                "credits_awarded": random.choices([1, 3, 4], weights=[1, 8, 2])[0],
+                "semesters_offered": sorted(random.sample(semester_names, min(len(semester_names), random.randint(2, 6))), key=semester_names.index),
+                "locations_offered": random.sample(DatasetGenerator.LOCATIONS, random.choice([1, 1, 2, 3])),
+                "prereqs": prereqs,
+                "faculty": random.sample(faculty_pools[catalog], random.choice([1, 1, 2])),
+                "required_technology": random.choice(['None', 'Laptop', 'Webcam', 'Graphing calculator', 'Lab kit']),
+                "reporting_instructions": random.choice(['M, W at 10am', 'T, Th at 1pm', 'Online - asynchronous', 'F at 9am', 'Sa at 11am'])
+            })
+        return courses
+
+    def get_classes(self, courses):
+        """Every class Course.create_classes makes, grouped by semester: semester -> [(class_key, course_id, credits, seats)]
+        class_key is (course_id, semester, location, professor) - see class_reference
+        """
+        classes_by_semester = {}
+        for course in courses:
+            course_id = f"{course['catalog']}{course['course_number']}"
+            for location in course['locations_offered']:
+                for semester in course['semesters_offered']:
+                    for faculty in course['faculty']:
+                        classes_by_semester.setdefault(semester, []).append(((course_id, semester, location, faculty), course_id, course['credits_awarded'], course['max_seats']))
+        return classes_by_semester
+
+    @staticmethod
+    def class_reference(class_key):
+        """The JSON form of a class key, resolved to a class id by Class.resolve_reference"""
+        return dict(zip(('course_id', 'semester', 'location', 'professor'), class_key))
+
+    def pick_classes(self, semester_classes, seats_left, taken_courses, prereqs, max_classes):
+        """Up to max_classes open classes in one semester whose prerequisites were done in earlier semesters, within the credit limit"""
+        completed_courses = frozenset(taken_courses)
+        picked = []
+        credits = 0
+        for attempt in range(max_classes * 4):
+            class_key, course_id, credits_awarded, max_seats = self.random.choice(semester_classes)
+            if (course_id in taken_courses or seats_left.get(class_key, max_seats) <= 0 or credits + credits_awarded > Student.MAX_SEMESTER_CREDITS
+                    or not all(prereq in completed_courses for prereq in prereqs[course_id])):
+                continue
+            seats_left[class_key] = seats_left.get(class_key, max_seats) - 1
+            taken_courses.add(course_id)
+            credits += credits_awarded
+            picked.append((class_key, course_id))
+            if len(picked) == max_classes:
+                break
+        return picked
+
+    def generate_students(self, courses, semesters):
+        """Students with registrations in past semesters (prerequisites first), drop history, and a cart for the last semester"""
+        random = self.random
+        semester_names = [semester['semester_name'] for semester in semesters]
+        semester_starts = {semester['semester_name']: datetime.strptime(semester['start_date'], "%m/%d/%Y") for semester in semesters}
+        prereqs = {f"{course['catalog']}{course['course_number']}": course['prereqs'] for course in courses}
+        classes_by_semester = self.get_classes(courses)
+        seats_left = {}
+        students = []
+        for number in range(1, self.student_count + 1):
+            registered_classes, course_transactions = [], []
+            taken_courses = set()
+            first_semester = random.randrange(len(semester_names))
+            for semester_name in semester_names[first_semester:-1]:
+                semester_classes = classes_by_semester.get(semester_name)
+                if not semester_classes or random.random() < 0.2:
+                    continue
+                for class_key, course_id in self.pick_classes(semester_classes, seats_left, taken_courses, prereqs, random.randint(1, 4)):
+                    registered_classes.append(DatasetGenerator.class_reference(class_key))
+                # Now and then a class was added and dropped before the semester started
+                if random.random() < 0.15:
+                    dropped = self.pick_classes(semester_classes, {}, set(taken_courses), prereqs, 1)
+                    for class_key, course_id in dropped:
+                        registered_at = semester_starts[semester_name] - timedelta(days=random.randint(10, 60), minutes=random.randint(0, 1439))
+                        dropped_at = registered_at + timedelta(days=random.randint(1, 9), minutes=random.randint(0, 1439))
+                        for action, timestamp in (('register', registered_at), ('drop', dropped_at)):
+                            course_transactions.append({"transaction_id": str(UUID(int=random.getrandbits(128), version=4)), "datetime": timestamp.isoformat(),
+                                                        "course": course_id, "class_id": DatasetGenerator.class_reference(class_key), "semester": semester_name, "action": action})
+            cart = []
+            last_semester_classes = classes_by_semester.get(semester_names[-1])
+            if last_semester_classes and random.random() < 0.5:
+                cart = [DatasetGenerator.class_reference(class_key) for class_key, course_id in self.pick_classes(last_semester_classes, seats_left, set(taken_courses), prereqs, random.randint(1, 3))]
+            students.append({
+                "username": f"student{number:06d}@student.umgc.edu",
+                "password": f"student{number:06d}STUDENT!",
+                "first_name": random.choice(DatasetGenerator.FIRST_NAMES),
+                "last_name": random.choice(DatasetGenerator.LAST_NAMES),
+                "phone_number": f"{random.randint(201, 989)}555{random.randint(0, 9999):04d}",
+                "registered_classes": registered_classes,
+                "course_transactions": course_transactions,
+                "cart": cart
+            })
+        return students
+
+    def write(self, output_path):
+        """Writes the three init_data files (and the arguments used) into output_path
+        Args:
+            output_path(Path): directory for the generated files
+        Returns:
+            dict: number of semesters, courses, classes and students generated
+        """
+        semesters = self.generate_semesters()
+        courses = self.generate_courses([semester['semester_name'] for semester in semesters])
+        students = self.generate_students(courses, semesters)
+        output_path.mkdir(parents=True, exist_ok=True)
+        manifest = {'seed': self.seed, 'courses': self.course_count, 'students': self.student_count, 'first_year': self.first_year, 'years': self.years}
+        for file_name, data in (('initial_semester_dates.json', semesters), ('initial_course_data.json', courses),
+                                ('initial_student_user_data.json', students), ('dataset_manifest.json', manifest)):
+            with open(output_path / file_name, 'w') as data_file:
+                dump(data, data_file, indent=None if len(data) > 1000 else 4)
+        return {
+            'semesters': len(semesters),
+            'courses': len(courses),
+            'classes': sum(len(semester_classes) for semester_classes in self.get_classes(courses).values()),
+            'students': len(students)
+        }
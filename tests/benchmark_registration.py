@@ -0,0 +1,343 @@
+"""Registration-rush load generator and latency benchmark
+
+Not part of the unit tests (unittest / pytest only collect test*.py). Drives the login -> catalog -> add to cart ->
+checkout -> drop flow with many concurrent students against a running instance and writes per-route latency
+percentiles, throughput, error counts and a seat-oversell check as JSON, so runs can be compared between commits.
+
+Usage (from the repository root):
+    # 1. Seed benchmark students and classes into database/database.db (a running app picks them up within
+    #    LOCAL_CACHE_CHECK_INTERVAL with Redis, or LOCAL_CACHE_TTL without it)
+    python tests/benchmark_registration.py seed --students 500 --classes 20 --seats 10
+    # 2. Start the app if it is not running, e.g. python src/app.py
+    # 3. Run the rush and keep the results
+    python tests/benchmark_registration.py run --students 500 --concurrency 50 --output bench_output.json
+    # Compare two result files
+    python tests/benchmark_registration.py compare before.json after.json
+    # Remove the benchmark data again
+    python tests/benchmark_registration.py clean
+"""
+import argparse, sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from http.cookiejar import CookieJar
+from json import dump, dumps, load
+from pathlib import Path
+from random import Random
+from re import search
+from sqlalchemy import delete, func, insert, select
+from statistics import mean, quantiles
+from subprocess import run as run_process
+from threading import Lock
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import build_opener, HTTPCookieProcessor, HTTPRedirectHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Benchmark data lives in its own course, semester and username range so it never mixes with the seeded catalog
+BENCH_CATALOG = 'BNCH'
+BENCH_COURSE_ID = 'BNCH100'
+BENCH_SEMESTER = 'Fall 2099'
+BENCH_USERNAME = 'bench{:06d}@student.umgc.edu'
+BENCH_PASSWORD = 'bench00BENCH()'
+BENCH_STUDENT_IDS = 90000000
+
+ROUTES = ('login', 'courses', 'add_to_cart', 'registercourse', 'drop_course')
+
+
+def get_app():
+    # Imported lazily: "run" and "compare" only talk HTTP / read files
+    import src.app as app_module
+    return app_module
+
+
+def clean(app_module):
+    """Deletes every benchmark row (students, their history, the benchmark course and its classes)
+    Args:
+        app_module(module): src.app
+    Returns:
+        None
+    """
+    db = app_module.db
+    class_ids = select_ids(app_module.Class.class_id, app_module.Class.course_id == BENCH_COURSE_ID)
+    student_ids = select_ids(app_module.Student.student_id, app_module.Student.student_email.like(BENCH_USERNAME.split('{')[0] + '%'))
+    for model, column, ids in ((app_module.Enrollment, 'class_id', class_ids), (app_module.Enrollment, 'student_id', student_ids),
+                               (app_module.CartItem, 'class_id', class_ids), (app_module.CartItem, 'student_id', student_ids),
+                               (app_module.WaitlistEntry, 'class_id', class_ids), (app_module.WaitlistEntry, 'student_id', student_ids),
+                               (app_module.Transaction, 'class_id', class_ids), (app_module.Transaction, 'student', student_ids)):
+        if ids:
+            db.session.execute(delete(model).where(getattr(model, column).in_(ids)))
+    if student_ids:
+        user_ids = select_ids(app_module.Student.id, app_module.Student.student_id.in_(student_ids))
+        db.session.execute(delete(app_module.Student).where(app_module.Student.student_id.in_(student_ids)))
+        db.session.execute(delete(app_module.User).where(app_module.User.id.in_(user_ids)))
+    db.session.execute(delete(app_module.Class).where(app_module.Class.course_id == BENCH_COURSE_ID))
+    course = db.session.get(app_module.Course, BENCH_COURSE_ID)
+    if course is not None:
+        db.session.delete(course)
+    db.session.commit()
+
+
+def select_ids(column, condition):
+    db = get_app().db
+    return list(db.session.execute(select(column).where(condition)).scalars())
+
+
+def seed(students, classes, seats):
+    """Replaces the benchmark data with N students and M open classes
+    Rows go in with executemany inserts and one shared password hash, so seeding thousands of students takes seconds.
+    Args:
+        students(int): number of students
+        classes(int): number of classes (one course, one far-future semester)
+        seats(int): seats per class
+    Returns:
+        None
+    """
+    app_module = get_app()
+    app, db = app_module.app, app_module.db
+    app_module.init_database(app_module.database_file_path, app, db, app_module.Course)
+    with app.app_context():
+        clean(app_module)
+        if db.session.get(app_module.Semester, BENCH_SEMESTER) is None:
+            db.session.add(app_module.Semester(semester_name=BENCH_SEMESTER, start_date=date(2099, 9, 1), end_date=date(2099, 12, 20)))
+        professors = [f"Prof. Bench {number}" for number in range(1, classes + 1)]
+        db.session.add(app_module.Course(catalog=BENCH_CATALOG, course_number=100, course_name='Registration Rush', description='Benchmark course.',
+                                         max_seats=seats, credits_awarded=3, semesters_offered=[BENCH_SEMESTER], locations_offered=['Online'],
+                                         prereqs=[], faculty=professors, required_technology='None', reporting_instructions='None'))
+        db.session.execute(insert(app_module.Class), [
+            {'course_id': BENCH_COURSE_ID, 'course_name': 'Registration Rush', 'location': 'Online', 'semester': BENCH_SEMESTER,
+             'professor': professor, 'credits_awarded': 3, 'available_seats': seats} for professor in professors])
+
+        password_hash = app_module.User.hash_password(BENCH_PASSWORD)
+        now = datetime.now(timezone.utc)
+        usernames = [BENCH_USERNAME.format(number) for number in range(students)]
+        db.session.execute(insert(app_module.User), [{'username': username, 'password': password_hash, 'created_at': now} for username in usernames])
+        user_ids = dict(db.session.execute(select(app_module.User.username, app_module.User.id).where(app_module.User.username.in_(usernames))).all())
+        taken_ids = set(select_ids(app_module.Student.student_id, app_module.Student.student_id >= BENCH_STUDENT_IDS))
+        free_ids = (student_id for student_id in range(BENCH_STUDENT_IDS, 100000000) if student_id not in taken_ids)
+        db.session.execute(insert(app_module.Student), [
+            {'id': user_ids[username], 'student_id': next(free_ids), 'first_name': 'bench', 'last_name': f"student{number}",
+             'student_email': username, 'phone_number': '0000000000', 'created_at': now} for number, username in enumerate(usernames)])
+        db.session.commit()
+    print(f"Seeded {students} students and {classes} classes with {seats} seats each ({BENCH_SEMESTER}).")
+
+
+class NoRedirect(HTTPRedirectHandler):
+    # Time each route on its own instead of the page it redirects to
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualStudent():
+    """One browser session (cookie jar) walking through the registration flow"""
+
+    def __init__(self, base_url, username, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.timeout = timeout
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect())
+
+    def request(self, path, form=None):
+        """Sends one request
+        Args:
+            path(str): route path
+            form(dict): form fields to POST, or None for a GET
+        Returns:
+            tuple: (status code or None on a connection error, seconds, body)
+        """
+        data = urlencode(form).encode() if form is not None else None
+        start = perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, data=data, timeout=self.timeout) as response:
+                return response.status, perf_counter() - start, response.read()
+        except HTTPError as e:
+            return e.code, perf_counter() - start, e.read()
+        except (URLError, OSError):
+            return None, perf_counter() - start, b''
+
+
+class Results():
+    """Latencies and outcomes per route, shared by every worker thread"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latencies = {route: [] for route in ROUTES}
+        self.statuses = {route: {} for route in ROUTES}
+        self.errors = dict.fromkeys(ROUTES, 0)
+
+    def record(self, route, status, seconds, expected_status=302):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][str(status)] = self.statuses[route].get(str(status), 0) + 1
+            # 503 is the waiting room, not an error
+            if status != expected_status and status != 503:
+                self.errors[route] += 1
+
+    def summary(self, elapsed):
+        """Per-route latency percentiles (ms), throughput (requests / s) and error counts"""
+        routes = {}
+        for route in ROUTES:
+            latencies = sorted(self.latencies[route])
+            statuses = self.statuses[route]
+            route_summary = {'requests': len(latencies), 'statuses': statuses, 'errors': self.errors[route],
+                             'queued': statuses.get('503', 0), 'throughput': len(latencies) / elapsed if elapsed else 0.0}
+            if latencies:
+                cut_points = quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+                route_summary.update({'mean_ms': mean(latencies) * 1000, 'p50_ms': cut_points[49] * 1000,
+                                      'p95_ms': cut_points[94] * 1000, 'p99_ms': cut_points[98] * 1000, 'max_ms': latencies[-1] * 1000})
+            routes[route] = route_summary
+        return routes
+
+
+def rush(student, class_ids, random, results):
+    """One student's pass through the flow: log in, browse, add a class, check out, drop it again"""
+    status, seconds, body = student.request('/login')
+    csrf_token = search(rb'name="csrf_token" type="hidden" value="([^"]+)"', body) or search(rb'value="([^"]+)"[^>]*name="csrf_token"', body)
+    status, seconds, body = student.request('/login', {'username': student.username, 'password': BENCH_PASSWORD,
+                                                       'csrf_token': csrf_token.group(1).decode() if csrf_token else ''})
+    # A successful login redirects to the landing page; the form coming back means it failed
+    results.record('login', status, seconds)
+    if status != 302:
+        return
+    status, seconds, body = student.request('/courses')
+    results.record('courses', status, seconds, expected_status=200)
+    class_id = random.choice(class_ids)
+    for route, path in (('add_to_cart', '/add_to_cart'), ('registercourse', '/registercourse'), ('drop_course', '/drop_course')):
+        status, seconds, body = student.request(path, {'class_id': class_id})
+        results.record(route, status, seconds)
+
+
+def check_seats(seats):
+    """Replays the benchmark classes' registration log to find oversold classes
+    Args:
+        seats(int): seats each class was seeded with
+    Returns:
+        dict: oversold classes (most students registered at once above the seat count) and seat counts that no longer add up
+    """
+    app_module = get_app()
+    app, db = app_module.app, app_module.db
+    with app.app_context():
+        class_ids = select_ids(app_module.Class.class_id, app_module.Class.course_id == BENCH_COURSE_ID)
+        enrolled = dict.fromkeys(class_ids, 0)
+        peak = dict.fromkeys(class_ids, 0)
+        transactions = db.session.execute(select(app_module.Transaction.class_id, app_module.Transaction.action)
+                                          .where(app_module.Transaction.class_id.in_(class_ids)).order_by(app_module.Transaction.id))
+        for class_id, action in transactions:
+            enrolled[class_id] += 1 if action == 'register' else -1 if action in ('drop', 'withdraw') else 0
+            peak[class_id] = max(peak[class_id], enrolled[class_id])
+        # Every seat is either free, taken by an enrollment or held by a cart item
+        taken = dict(db.session.execute(select(app_module.Enrollment.class_id, func.count()).where(app_module.Enrollment.class_id.in_(class_ids))
+                                        .group_by(app_module.Enrollment.class_id)).all())
+        held = dict(db.session.execute(select(app_module.CartItem.class_id, func.count()).where(app_module.CartItem.class_id.in_(class_ids),
+                                       app_module.CartItem.held_until.is_not(None)).group_by(app_module.CartItem.class_id)).all())
+        available = dict(db.session.execute(select(app_module.Class.class_id, app_module.Class.available_seats).where(app_module.Class.class_id.in_(class_ids))).all())
+    return {
+        'oversold': sum(peak[class_id] - seats for class_id in class_ids if peak[class_id] > seats),
+        'oversold_classes': [class_id for class_id in class_ids if peak[class_id] > seats or available[class_id] < 0],
+        'seat_mismatches': [class_id for class_id in class_ids if available[class_id] + taken.get(class_id, 0) + held.get(class_id, 0) != seats],
+    }
+
+
+def get_commit():
+    try:
+        return run_process(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(args):
+    app_module = get_app()
+    with app_module.app.app_context():
+        class_ids = select_ids(app_module.Class.class_id, app_module.Class.course_id == BENCH_COURSE_ID)
+        seats = app_module.db.session.get(app_module.Course, BENCH_COURSE_ID).max_seats if class_ids else 0
+    if not class_ids:
+        sys.exit("No benchmark classes found - run the seed command first.")
+
+    random = Random(args.seed)
+    students = [VirtualStudent(args.base_url, BENCH_USERNAME.format(number), args.timeout) for number in range(args.students)]
+    randoms = [Random(random.random()) for student in students]
+    results = Results()
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for future in [executor.submit(rush, student, class_ids, student_random, results) for student, student_random in zip(students, randoms)]:
+            future.result()
+    elapsed = perf_counter() - start
+
+    report = {
+        'commit': get_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'parameters': {'base_url': args.base_url, 'students': args.students, 'concurrency': args.concurrency,
+                       'classes': len(class_ids), 'seats': seats, 'seed': args.seed},
+        'elapsed_seconds': elapsed,
+        'routes': results.summary(elapsed),
+        'seats': check_seats(seats),
+    }
+    report['total'] = {'requests': sum(route['requests'] for route in report['routes'].values()),
+                       'errors': sum(route['errors'] for route in report['routes'].values()),
+                       'throughput': sum(route['throughput'] for route in report['routes'].values())}
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            dump(report, output_file, indent=2)
+    else:
+        print(dumps(report, indent=2))
+    print_report(report, file=sys.stderr)
+    return report
+
+
+def print_report(report, file=sys.stdout):
+    print(f"{'route':<16}{'requests':>9}{'errors':>8}{'queued':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}", file=file)
+    for route, route_summary in report['routes'].items():
+        print(f"{route:<16}{route_summary['requests']:>9}{route_summary['errors']:>8}{route_summary['queued']:>8}{route_summary['throughput']:>9.1f}"
+              f"{route_summary.get('p50_ms', 0):>9.1f}{route_summary.get('p95_ms', 0):>9.1f}{route_summary.get('p99_ms', 0):>9.1f}", file=file)
+    print(f"Oversold seats: {report['seats']['oversold']}, seat count mismatches: {len(report['seats']['seat_mismatches'])}", file=file)
+
+
+def compare(before_path, after_path):
+    """Prints the per-route p50 / p95 / p99 and throughput change between two result files"""
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = load(before_file), load(after_file)
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    for route in ROUTES:
+        old, new = before['routes'].get(route, {}), after['routes'].get(route, {})
+        changes = []
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput'):
+            if old.get(metric) and new.get(metric) is not None:
+                changes.append(f"{metric} {old[metric]:.1f} -> {new[metric]:.1f} ({(new[metric] - old[metric]) / old[metric]:+.0%})")
+        print(f"{route:<16}" + ', '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registration-rush load generator and latency benchmark')
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed_parser = commands.add_parser('seed', help='replace the benchmark students and classes')
+    seed_parser.add_argument('--students', type=int, default=500)
+    seed_parser.add_argument('--classes', type=int, default=20)
+    seed_parser.add_argument('--seats', type=int, default=10)
+    run_parser = commands.add_parser('run', help='drive the registration flow against a running instance')
+    run_parser.add_argument('--base-url', default='http://127.0.0.1:8080')
+    run_parser.add_argument('--students', type=int, default=500, help='students to log in (at most the number seeded)')
+    run_parser.add_argument('--concurrency', type=int, default=50, help='students going through the flow at once')
+    run_parser.add_argument('--seed', type=int, default=495, help='random seed for the classes students pick')
+    run_parser.add_argument('--timeout', type=float, default=30.0, help='seconds per request')
+    run_parser.add_argument('--output', help='JSON results file (default: stdout)')
+    compare_parser = commands.add_parser('compare', help='compare two JSON results files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    commands.add_parser('clean', help='delete the benchmark data')
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        seed(args.students, args.classes, args.seats)
+    elif args.command == 'run':
+        run_benchmark(args)
+    elif args.command == 'compare':
+        compare(args.before, args.after)
+    elif args.command == 'clean':
+        app_module = get_app()
+        with app_module.app.app_context():
+            clean(app_module)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,31 @@
 import shutil, sys, unittest
+from json import dump, dumps, load
+from pathlib import Path
+from tempfile import mkdtemp
 from bs4 import BeautifulSoup
-from src.app import app, Course, database_file_path, database_path, db, init_application, init_database, User
+from flask import g
+from os import _exit, dup, environ, fork, waitpid
+from redis import Redis
+from redis.exceptions import RedisError
+
+def redis_available(client):
+    try:
+        return client is not None and client.ping()
+    except RedisError:
+        return False
+
+# Without a Redis server the tests run on in-process sessions and caches, and the Redis-only tests are skipped
+redis_url = environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+if not redis_url or not redis_available(Redis.from_url(redis_url, socket_connect_timeout=0.5)):
+    environ['REDIS_URL'] = ''
+    environ.setdefault('SESSION_BACKEND', 'memory')
+
+from src.app import app, bcrypt, CartItem, Class, Course, course_facet_index, create_app, CourseFaculty, CourseLocation, CourseSemester, database_file_path, database_path, db, Enrollment, FallbackRedisSessionInterface, fragment_cache, init_database, password_hasher, prepare_database, principal_cache, query_profiler, QueryProfiler, Semester, semester_calendar, SharedVersion, Student, ThreadPoolWSGIServer, Transaction, User, WaitlistEntry, waiting_room
+from src.dataset import DatasetGenerator
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import event, inspect, select, text, update
+from threading import Event, Thread
+from urllib.request import urlopen
 
 class TestUserRegistration(unittest.TestCase):
 
@@ -77,6 +102,9 @@ class TestUserRegistration(unittest.TestCase):
     first_name10 = 'WALUIGI'
     last_name10 = 'WALUIGI'
 
+    # The seeded semester calendar was written for this day (Summer 2024 in session, Fall 2025 open for registration)
+    seed_data_date = date(2024, 8, 1)
+
     # Runs before every test
     def setUp(self):
         """
@@ -102,8 +130,19 @@ class TestUserRegistration(unittest.TestCase):
     def setUpClass(cls):
         """
         """
-        # Setting up the application
-        init_application()
+        # Seed data with the semester calendar moved so that today falls where seed_data_date did
+        cls.init_data_path = Path(mkdtemp())
+        shutil.copytree(app.config['INIT_DATA_PATH'], cls.init_data_path, dirs_exist_ok=True)
+        shift = date.today() - cls.seed_data_date
+        semester_dates_path = cls.init_data_path / 'initial_semester_dates.json'
+        with open(semester_dates_path) as semester_dates_file:
+            semester_dates = load(semester_dates_file)
+        for semester in semester_dates:
+            for field in ('start_date', 'end_date'):
+                semester[field] = (datetime.strptime(semester[field], "%m/%d/%Y") + shift).strftime("%m/%d/%Y")
+        with open(semester_dates_path, 'w') as semester_dates_file:
+            dump(semester_dates, semester_dates_file)
+        app.config['INIT_DATA_PATH'] = cls.init_data_path
         # Setting up the database
         init_database(database_file_path, app, db, Course)
         if database_file_path.exists():
@@ -123,6 +162,7 @@ class TestUserRegistration(unittest.TestCase):
             # Deleting the database after all test complete
             shutil.rmtree(database_path)
             print(f"\nSuccessfully deleted the database: {database_path}")
+        shutil.rmtree(cls.init_data_path, ignore_errors=True)
     
     def get_csrf_token(self):
         """
@@ -146,6 +186,20 @@ class TestUserRegistration(unittest.TestCase):
             self.assertRegex(response.data, pattern, "The response does not include a valid 8-digit Student ID.")
         return response
 
+    def create_memory_app(self, *legacy_columns, **config):
+        """
+        Seeded in-memory database for tests that change the schema or the app settings, so the shared test app is left alone
+        legacy_columns are old JSON columns added back to students for the migration tests
+        """
+        memory_app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REDIS_URL': '', 'SESSION_BACKEND': 'memory', 'INIT_DATA_PATH': app.config['INIT_DATA_PATH'],
+                                 'BCRYPT_LOG_ROUNDS': 4, 'PASSWORD_HASH_TARGET_TIME': None, **config})
+        self.assertTrue(init_database(database_file_path, memory_app, db, Course))
+        with memory_app.app_context():
+            for column in legacy_columns:
+                db.session.execute(text(f"ALTER TABLE students ADD COLUMN {column} JSON"))
+            db.session.commit()
+        return memory_app
+
     def test_01_register_new_user_account(self):
         """
         Test case 1 - Register a new user account
@@ -471,6 +525,1175 @@ class TestUserRegistration(unittest.TestCase):
             self.assertTrue(response.request.path.endswith(template), f"The user is not being redirected to {template}")
             self.assertEqual(response.status_code, 200)
 
+    def test_11_course_search(self):
+        """
+        Test 11 - Course search uses the full-text index with prefix matching and stays in sync with course updates
+        """
+        self.login_with_password(self.username, self.password)
+        # Prefix match on a partial word
+        response = self.client.post('/courses', data={'search': 'calcul'}, follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'MATH101', response.data)
+        self.assertNotIn(b'CMSC101', response.data)
+        # Course ID search
+        response = self.client.post('/courses', data={'search': 'cmsc101'}, follow_redirects=True)
+        self.assertIn(b'CMSC101', response.data)
+        # Punctuation only finds nothing instead of erroring
+        response = self.client.post('/courses', data={'search': '%%'}, follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'MATH101', response.data)
+        # A short query is paginated like browsing, in rank order, with the search carried by the page links
+        with app.app_context():
+            ranked_ids = Course.search_course_ids('in')
+        self.assertGreater(len(ranked_ids), 2)
+        response = self.client.post('/courses?per_page=2', data={'search': 'in'})
+        seen_course_ids = []
+        while True:
+            soup = BeautifulSoup(response.data, 'html.parser')
+            page_ids = [link.text for link in soup.select('tbody th a')]
+            self.assertLessEqual(len(page_ids), 2)
+            seen_course_ids.extend(page_ids)
+            next_link = soup.find('a', string='Next')
+            if next_link is None:
+                break
+            self.assertIn('search=in', next_link['href'])
+            response = self.client.get(next_link['href'])
+        self.assertEqual(seen_course_ids, ranked_ids)
+        with app.app_context():
+            self.assertEqual(len(Course.search_course_ids('in', limit=2)), 2)
+        # Index follows course updates
+        with app.app_context():
+            course = Course.get_course('INTR101')
+            original_description = course.description
+            course.description = 'Zymurgy for beginners.'
+            db.session.commit()
+            self.assertEqual([c.course_id for c in Course.search_courses('zymurg')], ['INTR101'])
+            course.description = original_description
+            db.session.commit()
+            self.assertEqual(Course.search_courses('zymurg'), [])
+            # The triggers kept the rowid-keyed index matching the courses table (raises if they did not)
+            db.session.execute(text("INSERT INTO courses_fts (courses_fts, rank) VALUES ('integrity-check', 1)"))
+            self.assertEqual(Course.rebuild_search_index(), Course.query.count())
+            self.assertEqual([c.course_id for c in Course.search_courses('INTR101')], ['INTR101'])
+
+    def test_12_course_filters(self):
+        """
+        Test 12 - Catalog filters run against the normalized offering tables and match the JSON columns
+        """
+        self.login_with_password(self.username, self.password)
+        response = self.client.get('/courses?semester=Spring+2024', follow_redirects=True)
+        self.assertIn(b'INTR101', response.data)
+        self.assertNotIn(b'ENGR101', response.data)
+        response = self.client.get('/courses?location=Campus+Gym', follow_redirects=True)
+        self.assertIn(b'PHED101', response.data)
+        self.assertNotIn(b'MATH101', response.data)
+        response = self.client.get('/courses?professor=Dr.+Mario&location=Online&catalog=MATH', follow_redirects=True)
+        self.assertIn(b'MATH101', response.data)
+        self.assertNotIn(b'AASP102', response.data)
+        # Migration rebuilds the same rows from the JSON columns
+        with app.app_context():
+            self.assertEqual(Course.migrate_offerings(), Course.query.count())
+            for course in Course.query.all():
+                self.assertEqual(sorted(row.semester for row in course.course_semesters), sorted(set(course.semesters_offered)))
+                self.assertEqual(sorted(row.location for row in course.course_locations), sorted(set(course.locations_offered)))
+                self.assertEqual(sorted(row.professor for row in course.course_faculty), sorted(set(course.faculty)))
+                self.assertEqual(sorted(row.prereq_id for row in course.course_prereqs), sorted(set(course.prereqs)))
+
+    def test_13_cart_checkout_is_all_or_nothing(self):
+        """
+        Test 13 - A full class rolls back the whole cart, otherwise every class gets exactly one seat
+        """
+        with app.app_context():
+            open_class = Class.query.filter_by(course_id='CMSC101', semester='Fall 2025').first()
+            full_class = Class.query.filter_by(course_id='MATH101', semester='Fall 2025').first()
+            open_class_id, full_class_id = open_class.class_id, full_class.class_id
+            open_seats, full_seats = open_class.available_seats, full_class.available_seats
+            full_class.available_seats = 0
+            student = User.query.filter_by(username=self.username).first().student
+            db.session.add(CartItem(student_id=student.student_id, class_id=open_class_id))
+            db.session.add(CartItem(student_id=student.student_id, class_id=full_class_id))
+            db.session.commit()
+            # Engine reports each class and commits nothing by itself
+            self.assertEqual(Class.allocate_seats([open_class_id, full_class_id]), {open_class_id: True, full_class_id: False})
+            db.session.rollback()
+            self.assertEqual(db.session.get(Class, open_class_id).available_seats, open_seats)
+
+        self.login_with_password(self.username, self.password)
+        response = self.client.post('/registercourse', data={'csrf_token': self.csrf_token}, follow_redirects=True)
+        self.assertIn(b'does not have any available seats', response.data)
+        self.assertIn(b'No classes were registered', response.data)
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            self.assertEqual(student.registered_classes, [])
+            self.assertEqual(sorted(student.cart), sorted([open_class_id, full_class_id]))
+            self.assertEqual(db.session.get(Class, open_class_id).available_seats, open_seats)
+            db.session.get(Class, full_class_id).available_seats = full_seats
+            db.session.commit()
+
+        response = self.client.post('/registercourse', data={'csrf_token': self.csrf_token}, follow_redirects=True)
+        self.assertIn(b'All available classes selected have been registered successfully.', response.data)
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            self.assertEqual(sorted(student.registered_classes), sorted([open_class_id, full_class_id]))
+            self.assertEqual(student.cart, [])
+            self.assertEqual(db.session.get(Class, open_class_id).available_seats, open_seats - 1)
+            self.assertEqual(db.session.get(Class, full_class_id).available_seats, full_seats - 1)
+            # Restore the starting state
+            for class_id in (open_class_id, full_class_id):
+                db.session.get(Class, class_id).free_seat()
+            Enrollment.query.filter_by(student_id=student.student_id).delete()
+            Transaction.query.filter_by(student=student.student_id).delete()
+            db.session.commit()
+            self.assertEqual(db.session.get(Class, open_class_id).available_seats, open_seats)
+
+    def test_14_enrollment_tables(self):
+        """
+        Test 14 - Cart and registrations are rows keyed by (student_id, class_id) with roster lookups by class
+        """
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            registered_class = Class.query.filter_by(course_id='CMSC315').first()
+            registered_class_id = registered_class.class_id
+            roster_size = registered_class.get_enrollment_count()
+            db.session.add(Enrollment(student_id=student.student_id, class_id=registered_class_id))
+            db.session.commit()
+            self.assertIn(registered_class_id, student.registered_classes)
+            self.assertEqual(registered_class.get_enrollment_count(), roster_size + 1)
+            self.assertIn(student.student_id, [rostered.student_id for rostered in registered_class.get_roster()])
+
+        # Registered classes page and drop route work off the enrollments table
+        self.login_with_password(self.username, self.password)
+        response = self.client.get('/registered', follow_redirects=True)
+        self.assertIn(b'CMSC315', response.data)
+
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            Enrollment.query.filter_by(student_id=student.student_id, class_id=registered_class_id).delete()
+            db.session.commit()
+
+        # Old JSON columns are copied over once by the migration
+        with self.create_memory_app('cart', 'registered_classes').app_context():
+            student = Student.query.first()
+            CartItem.query.filter_by(student_id=student.student_id).delete()
+            Enrollment.query.filter_by(student_id=student.student_id).delete()
+            db.session.execute(
+                text("UPDATE students SET cart = :cart, registered_classes = :registered WHERE student_id = :student_id"),
+                {'cart': '[7]', 'registered': f'[{registered_class_id}, {registered_class_id}]', 'student_id': student.student_id}
+            )
+            db.session.commit()
+            self.assertEqual(Student.migrate_enrollments(), 2)
+            self.assertEqual(Student.migrate_enrollments(), 0)
+            self.assertEqual(student.cart, [7])
+            self.assertEqual(student.registered_classes, [registered_class_id])
+            self.assertTrue(student.remove_class_from_cart(7))
+            self.assertFalse(student.remove_class_from_cart(7))
+
+    def test_15_transaction_log(self):
+        """
+        Test 15 - The registration log is an append-only table filtered and paginated in SQL
+        """
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            ended_class = Class.query.filter_by(course_id='INTR101', semester='Spring 2024').first()
+            for action in (Transaction.REGISTER, Transaction.DROP, Transaction.REGISTER):
+                student.log_transaction(ended_class, action, commit=False)
+            db.session.commit()
+            log_entries, next_cursor, previous_cursor = Transaction.get_log_page(student.student_id)
+            self.assertEqual([entry['action'] for entry in log_entries], ['complete', 'drop', 'complete'])
+            self.assertIsNone(next_cursor)
+            self.assertIsNone(previous_cursor)
+            first_page, next_cursor, previous_cursor = Transaction.get_log_page(student.student_id, 'complete', per_page=1)
+            self.assertEqual(len(first_page), 1)
+            self.assertIsNotNone(next_cursor)
+            self.assertIsNone(previous_cursor)
+            log_entries, next_cursor, previous_cursor = Transaction.get_log_page(student.student_id, 'complete', after=next_cursor, per_page=1)
+            self.assertEqual(len(log_entries), 1)
+            self.assertNotEqual(log_entries[0]['transaction_id'], first_page[0]['transaction_id'])
+            self.assertIsNone(next_cursor)
+            log_entries, next_cursor, previous_cursor = Transaction.get_log_page(student.student_id, 'complete', before=previous_cursor, per_page=1)
+            self.assertEqual(log_entries, first_page)
+            legacy_entry = dict(log_entries[0], transaction_id='legacy-transaction', action='withdraw')
+            Transaction.query.filter_by(student=student.student_id).delete()
+            db.session.commit()
+
+        # Old JSON log entries are copied once by the migration
+        with self.create_memory_app('course_transactions').app_context():
+            student = Student.query.first()
+            legacy_entry['student'] = student.student_id
+            logged = len(student.course_transactions)
+            db.session.execute(
+                text("UPDATE students SET course_transactions = :log WHERE student_id = :student_id"),
+                {'log': dumps([dumps(legacy_entry)]), 'student_id': student.student_id}
+            )
+            db.session.commit()
+            self.assertEqual(Transaction.migrate_log(), 1)
+            self.assertEqual(Transaction.migrate_log(), 0)
+            self.assertEqual(len(student.course_transactions), logged + 1)
+            log_entries, next_cursor, previous_cursor = Transaction.get_log_page(student.student_id, 'withdraw')
+            self.assertEqual([entry['transaction_id'] for entry in log_entries], ['legacy-transaction'])
+
+    def test_16_batch_loaders(self):
+        """
+        Test 16 - Class and Semester batch loaders fetch each entity type once per request
+        """
+        statements = []
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.test_request_context():
+            class_ids = [row.class_id for row in Class.query.with_entities(Class.class_id).limit(10).all()]
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                classes = Class.get_classes(class_ids + class_ids[:3] + [999999])
+                self.assertEqual(len(statements), 1)
+                self.assertEqual(sorted(classes), sorted(class_ids))
+                # Cached for the rest of the request - courses were loaded with the classes
+                self.assertIs(Class.get_class(class_ids[0]), classes[class_ids[0]])
+                self.assertEqual(Course.get_course(classes[class_ids[0]].course_id).course_id, classes[class_ids[0]].course_id)
+                self.assertEqual(len(statements), 1)
+                semester_names = list({loaded_class.semester for loaded_class in classes.values()})
+                semesters = Semester.get_semesters(semester_names * 2)
+                self.assertEqual(sorted(semesters), sorted(semester_names))
+                for semester_name in semester_names:
+                    Semester.get_semester(semester_name)
+                self.assertEqual(len(statements), 2)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+    def test_17_semester_calendar(self):
+        """
+        Test 17 - Semester statuses come from the in-memory calendar, which reloads after a Semester write
+        """
+        statements = []
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            classes = Class.query.limit(20).all()
+            semester_calendar.get_status('Spring 2024')
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                for current_class in classes:
+                    current_class.get_semester_status()
+                self.assertEqual(statements, [])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+            start_date, end_date = semester_calendar.get_dates('Spring 2024')
+            self.assertEqual(semester_calendar.get_status('Spring 2024', start_date + timedelta(days=1)), Semester.IN_SESSION)
+            self.assertEqual(semester_calendar.get_status('Spring 2024', start_date - timedelta(days=1)), Semester.UPCOMING)
+            self.assertEqual(semester_calendar.get_status('Spring 2024', end_date + timedelta(days=1)), Semester.ENDED)
+            self.assertEqual(semester_calendar.get_status('Winter 1999'), Semester.INVALID)
+
+            # Writes are picked up after commit
+            db.session.add(Semester(semester_name='Winter 2030', start_date=date(2030, 1, 2), end_date=date(2030, 2, 2)))
+            db.session.commit()
+            self.assertEqual(semester_calendar.get_status('Winter 2030', date(2030, 1, 10)), Semester.IN_SESSION)
+            semester = Semester.get_semester('Winter 2030')
+            semester.start_date = date(2030, 1, 20)
+            db.session.commit()
+            self.assertEqual(semester_calendar.get_status('Winter 2030', date(2030, 1, 10)), Semester.UPCOMING)
+            db.session.delete(semester)
+            db.session.commit()
+            self.assertEqual(semester_calendar.get_status('Winter 2030', date(2030, 1, 10)), Semester.INVALID)
+
+    def test_18_semester_status_filter(self):
+        """
+        Test 18 - The SQL semester status predicates agree with Semester.compute_status
+        """
+        with app.app_context():
+            semesters = Semester.query.all()
+            for today in [date(2024, 1, 1), date(2024, 4, 1), date(2024, 7, 1), date(2025, 1, 15), date(2030, 1, 1)]:
+                for status in [Semester.UPCOMING, Semester.IN_SESSION, Semester.ENDED]:
+                    expected = {semester.semester_name for semester in semesters if Semester.compute_status(semester.start_date, semester.end_date, today) == status}
+                    matched = {semester.semester_name for semester in Semester.query.filter(Semester.status_filter(status, today)).all()}
+                    self.assertEqual(matched, expected)
+
+            index_names = {index['name'] for index in inspect(db.engine).get_indexes('classes')}
+            self.assertIn('ix_classes_course_semester_location_professor', index_names)
+
+    def test_19_keyset_pagination(self):
+        """
+        Test 19 - Catalog and section pages are walked with next/previous cursors
+        """
+        with app.app_context():
+            all_course_ids = [course_id for (course_id,) in db.session.query(Course.course_id).order_by(Course.course_id).all()]
+
+        self.login_with_password(self.username, self.password)
+        seen_course_ids = []
+        url = '/courses?per_page=2'
+        previous_url = None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            soup = BeautifulSoup(response.data, 'html.parser')
+            page_ids = [link.text for link in soup.select('tbody th a')]
+            self.assertLessEqual(len(page_ids), 2)
+            seen_course_ids.extend(page_ids)
+            next_link = soup.find('a', string='Next')
+            previous_link = soup.find('a', string='Previous')
+            self.assertEqual(previous_link is None, previous_url is None)
+            previous_url = url
+            url = next_link['href'] if next_link else None
+        self.assertEqual(seen_course_ids, all_course_ids)
+
+        # Previous goes back to the page before
+        second_page = BeautifulSoup(self.client.get('/courses?per_page=2').data, 'html.parser').find('a', string='Next')['href']
+        soup = BeautifulSoup(self.client.get(second_page).data, 'html.parser')
+        soup = BeautifulSoup(self.client.get(soup.find('a', string='Previous')['href']).data, 'html.parser')
+        self.assertEqual([link.text for link in soup.select('tbody th a')], all_course_ids[:2])
+
+        # A malformed cursor is treated as the first page
+        response = self.client.get('/courses?per_page=2&after=not-a-cursor')
+        soup = BeautifulSoup(response.data, 'html.parser')
+        self.assertEqual([link.text for link in soup.select('tbody th a')], all_course_ids[:2])
+
+        # Filters are kept on the cursor links
+        response = self.client.get('/course/ARTS101?show_all_classes=True&per_page=1')
+        next_link = BeautifulSoup(response.data, 'html.parser').find('a', string='Next')
+        self.assertIn('show_all_classes=True', next_link['href'])
+        self.assertIn('per_page=1', next_link['href'])
+
+    def test_20_course_facet_index(self):
+        """
+        Test 20 - Facet bitmaps match the SQL filters, count every option and follow committed Course writes
+        """
+        with app.app_context():
+            matching_ids, facet_counts = course_facet_index.search({'semester': 'Spring 2025', 'location': 'Online'})
+            expected_ids = [course_id for (course_id,) in db.session.query(Course.course_id)
+                            .join(CourseSemester).filter(CourseSemester.semester == 'Spring 2025')
+                            .join(CourseLocation).filter(CourseLocation.location == 'Online')
+                            .order_by(Course.course_id).all()]
+            self.assertEqual(matching_ids, expected_ids)
+            # Counts for a facet ignore that facet's own selection
+            self.assertEqual(facet_counts['location']['Online'], len(expected_ids))
+            online_in_any_semester = db.session.query(CourseLocation.course_id).filter(CourseLocation.location == 'Online').count()
+            _, facet_counts = course_facet_index.search({'location': 'Online'})
+            self.assertEqual(facet_counts['location']['Online'], online_in_any_semester)
+            professor = db.session.query(CourseFaculty.professor).first()[0]
+            professor_course_ids = sorted(course_id for (course_id,) in db.session.query(CourseFaculty.course_id).filter(CourseFaculty.professor == professor).all())
+            self.assertEqual(course_facet_index.search({'professor': professor})[0], professor_course_ids)
+
+            # Within / exclude narrow the candidate courses
+            matching_ids, _ = course_facet_index.search({}, within=expected_ids[:2], exclude=expected_ids[:1])
+            self.assertEqual(matching_ids, expected_ids[1:2])
+
+            # Committed writes are reindexed on the next search
+            course = Course(catalog='FACT', course_number=101, description='Facet test', course_name='Facet Test', max_seats=10,
+                            credits_awarded=3, semesters_offered=['Winter 2031'], locations_offered=['Online'], prereqs=[], faculty=['Dr. Facet'],
+                            required_technology='None', reporting_instructions='None')
+            db.session.add(course)
+            db.session.commit()
+            self.assertEqual(course_facet_index.search({'semester': 'Winter 2031'})[0], ['FACT101'])
+            course.semesters_offered = ['Winter 2032']
+            db.session.commit()
+            self.assertEqual(course_facet_index.search({'semester': 'Winter 2031'})[0], [])
+            self.assertEqual(course_facet_index.search({'professor': 'Dr. Facet', 'semester': 'Winter 2032'})[0], ['FACT101'])
+            db.session.delete(course)
+            db.session.commit()
+            _, facet_counts = course_facet_index.search({})
+            self.assertNotIn('Winter 2032', facet_counts['semester'])
+            self.assertNotIn('FACT', facet_counts['catalog'])
+
+        self.login_with_password(self.username, self.password)
+        response = self.client.get('/courses?location=Online')
+        self.assertIn(f'Online ({online_in_any_semester})'.encode(), response.data)
+
+    @unittest.skipUnless(redis_available(app.config['SESSION_REDIS']), "needs a Redis server")
+    def test_21_fragment_cache(self):
+        """
+        Test 21 - Rendered tables are reused until a Course / Class write bumps the catalog version, or a seat count change
+        bumps the seat version of the section tables
+        """
+        self.login_with_password(self.username, self.password)
+        with app.app_context():
+            open_class = Class.query.filter(Class.available_seats > 0).order_by(Class.class_id).first()
+            class_id, course_id, seats = open_class.class_id, open_class.course_id, open_class.available_seats
+
+        def fragment_stats():
+            with app.app_context():
+                return fragment_cache.stats()
+
+        def seat_cell():
+            soup = BeautifulSoup(self.client.get(f'/course/{course_id}?show_all_classes=True&per_page=100').data, 'html.parser')
+            row = soup.find('td', string=str(class_id)).parent
+            return row.find_all('td')[8].text
+
+        self.assertEqual(seat_cell(), str(seats))
+        hits = fragment_stats()['process']['hits']
+        self.assertEqual(seat_cell(), str(seats))
+        self.assertEqual(fragment_stats()['process']['hits'], hits + 1)
+
+        self.client.get('/courses?per_page=7')
+        with app.app_context():
+            self.assertTrue(db.session.get(Class, class_id).allocate_seat())
+        misses = fragment_stats()['process']['misses']
+        self.assertEqual(seat_cell(), str(seats - 1))
+        self.assertEqual(fragment_stats()['process']['misses'], misses + 1)
+        # The catalog table shows no seat counts and is still cached
+        hits = fragment_stats()['process']['hits']
+        self.client.get('/courses?per_page=7')
+        self.assertEqual(fragment_stats()['process']['hits'], hits + 1)
+        with app.app_context():
+            self.assertTrue(db.session.get(Class, class_id).free_seat())
+        self.assertEqual(seat_cell(), str(seats))
+
+        # The least recently used fragments are evicted past the size limit
+        max_entries = app.config['FRAGMENT_CACHE_MAX_ENTRIES']
+        app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = 2
+        try:
+            for per_page in (1, 2, 3):
+                self.client.get(f'/courses?per_page={per_page}')
+            fragment_stats = fragment_stats()
+            self.assertLessEqual(fragment_stats['entries'], 2)
+            self.assertGreater(fragment_stats['total'].get('evictions', 0), 0)
+        finally:
+            app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = max_entries
+
+    def test_22_seat_holds(self):
+        """
+        Test 22 - Adding a class to the cart holds a seat until checkout, removal or expiry
+        """
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            held_class = Class.query.filter_by(course_id='CMSC101', semester='Fall 2025').first()
+            class_id, seats = held_class.class_id, held_class.available_seats
+
+            # Add holds a seat, remove gives it back
+            student.add_course_to_cart(held_class)
+            self.assertEqual(db.session.get(Class, class_id).available_seats, seats - 1)
+            self.assertIsNotNone(db.session.get(CartItem, (student.student_id, class_id)).held_until)
+            self.assertTrue(student.remove_class_from_cart(class_id))
+            db.session.commit()
+            self.assertEqual(db.session.get(Class, class_id).available_seats, seats)
+
+            # The last seat is held - nobody else can take it until the hold expires and is swept
+            held_class = db.session.get(Class, class_id)
+            held_class.available_seats = 1
+            db.session.commit()
+            student.add_course_to_cart(held_class)
+            self.assertEqual(Class.allocate_seats([class_id]), {class_id: False})
+            db.session.rollback()
+            self.assertEqual(CartItem.release_expired_holds(), 0)
+            db.session.get(CartItem, (student.student_id, class_id)).held_until = datetime.now(timezone.utc) - timedelta(minutes=1)
+            db.session.commit()
+            self.assertEqual(CartItem.release_expired_holds(), 1)
+            self.assertEqual(db.session.get(Class, class_id).available_seats, 1)
+            self.assertIsNone(db.session.get(CartItem, (student.student_id, class_id)).held_until)
+            self.assertEqual(student.cart, [class_id])
+
+            # Checkout takes a seat for an unheld item and converts a held one without taking a second seat
+            student.clear_cart()
+            db.session.commit()
+            student.add_course_to_cart(db.session.get(Class, class_id))
+            self.assertEqual(db.session.get(Class, class_id).available_seats, 0)
+
+        self.login_with_password(self.username, self.password)
+        response = self.client.get('/cart', follow_redirects=True)
+        self.assertIn(b'UTC', response.data)
+        response = self.client.post('/registercourse', data={'csrf_token': self.csrf_token}, follow_redirects=True)
+        self.assertIn(b'All available classes selected have been registered successfully.', response.data)
+
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            self.assertEqual(student.registered_classes, [class_id])
+            self.assertEqual(db.session.get(Class, class_id).available_seats, 0)
+            # Restore the starting state
+            Enrollment.query.filter_by(student_id=student.student_id).delete()
+            db.session.get(Class, class_id).available_seats = seats
+            db.session.commit()
+
+    def test_23_waitlist(self):
+        """
+        Test 23 - Full classes put students on a FIFO waitlist, and freed seats go to the next eligible student
+        """
+        with app.app_context():
+            waitlisted_class = Class.query.filter_by(course_id='CMSC101', semester='Fall 2025').first()
+            class_id, seats = waitlisted_class.class_id, waitlisted_class.available_seats
+            first, second, over_limit = [User.query.filter_by(username=f'student0{number}@student.umgc.edu').first().student for number in (2, 3, 4)]
+            student_ids = [first.student_id, second.student_id, over_limit.student_id]
+            enrollments_before = {student_id: set(db.session.query(Enrollment.class_id).filter_by(student_id=student_id).all()) for student_id in student_ids}
+
+            # Fill the over-limit student's Fall 2025 credits so the class would break the 12 credit rule
+            registered_ids = {registered_id for (registered_id,) in enrollments_before[over_limit.student_id]}
+            fall_credits = sum(registered.credits_awarded for registered in Class.get_classes(list(registered_ids)).values() if registered.semester == 'Fall 2025')
+            for fall_class in Class.query.filter(Class.semester == 'Fall 2025', Class.course_id != 'CMSC101').all():
+                if fall_credits + waitlisted_class.credits_awarded > Student.MAX_SEMESTER_CREDITS:
+                    break
+                if fall_class.class_id not in registered_ids:
+                    db.session.add(Enrollment(student_id=over_limit.student_id, class_id=fall_class.class_id))
+                    fall_credits += fall_class.credits_awarded
+            waitlisted_class.available_seats = 0
+            db.session.commit()
+
+            self.assertEqual(WaitlistEntry.join(over_limit.student_id, class_id), 1)
+            first.add_course_to_cart(waitlisted_class)
+            second.add_course_to_cart(waitlisted_class)
+            self.assertEqual(first.cart, [])
+            self.assertEqual(WaitlistEntry.join(second.student_id, class_id), 3)
+
+            # One freed seat skips the over-limit student and goes to the next in line
+            db.session.get(Class, class_id).free_seat()
+            self.assertIn(class_id, first.registered_classes)
+            self.assertNotIn(class_id, over_limit.registered_classes)
+            self.assertIsNone(WaitlistEntry.query.filter_by(student_id=over_limit.student_id, class_id=class_id).first())
+            self.assertEqual(WaitlistEntry.join(second.student_id, class_id), 1)
+            self.assertEqual(db.session.get(Class, class_id).available_seats, 0)
+            self.assertEqual(first.course_transactions[-1].action, 'register')
+
+            # Expanding the section promotes the waitlist in the same commit
+            db.session.get(Class, class_id).available_seats = 2
+            db.session.commit()
+            self.assertIn(class_id, second.registered_classes)
+            self.assertEqual(db.session.get(Class, class_id).available_seats, 1)
+            self.assertEqual(WaitlistEntry.query.filter_by(class_id=class_id).count(), 0)
+            self.assertEqual(Class.promote_waitlist([class_id]), [])
+
+            # Restore the starting state
+            for student_id in student_ids:
+                Enrollment.query.filter(Enrollment.student_id == student_id, Enrollment.class_id.notin_(
+                    [class_id_before for (class_id_before,) in enrollments_before[student_id]]
+                )).delete(synchronize_session=False)
+                Transaction.query.filter_by(student=student_id, class_id=class_id).delete()
+            db.session.get(Class, class_id).available_seats = seats
+            db.session.commit()
+
+        # The cart page lists the student's waitlists
+        with app.app_context():
+            student_id = User.query.filter_by(username=self.username).first().student.student_id
+            WaitlistEntry.join(student_id, class_id)
+        self.login_with_password(self.username, self.password)
+        response = self.client.get('/cart', follow_redirects=True)
+        self.assertIn(b'Leave Waitlist', response.data)
+        response = self.client.post('/leave_waitlist', data={'class_id': class_id, 'csrf_token': self.csrf_token}, follow_redirects=True)
+        self.assertIn(b'You have left the waitlist', response.data)
+
+    def test_24_checkout_unit_of_work(self):
+        """
+        Test 24 - Checkout is one transaction with bulk inserts, one commit, and a result for every class
+        """
+        commits = []
+        statements = []
+        def count_commit(conn):
+            commits.append(conn)
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, executemany))
+
+        with app.test_request_context():
+            student = User.query.filter_by(username=self.username).first().student
+            cart_classes = [Class.query.filter_by(course_id=course_id, semester='Fall 2025').first() for course_id in ('CMSC101', 'MATH101')]
+            class_ids = [cart_class.class_id for cart_class in cart_classes]
+            seats = {cart_class.class_id: cart_class.available_seats for cart_class in cart_classes}
+            for class_id in class_ids:
+                db.session.add(CartItem(student_id=student.student_id, class_id=class_id))
+            db.session.commit()
+
+            event.listen(db.engine, 'commit', count_commit)
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                results = student.register_cart_courses()
+            finally:
+                event.remove(db.engine, 'commit', count_commit)
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+            self.assertEqual(results, {class_id: Student.REGISTERED for class_id in class_ids})
+            self.assertEqual(len(commits), 1)
+            self.assertEqual([executemany for statement, executemany in statements if statement.startswith('INSERT INTO enrollments')], [True])
+            self.assertEqual([executemany for statement, executemany in statements if statement.startswith('INSERT INTO transactions')], [True])
+            self.assertEqual(sorted(student.registered_classes), sorted(class_ids))
+            self.assertEqual([transaction.class_id for transaction in student.course_transactions[-2:]], class_ids)
+
+            # Over the credit limit - every class gets a result and nothing is registered
+            over_limit_class = Class.query.filter(Class.semester == 'Fall 2025', Class.class_id.notin_(class_ids), Class.credits_awarded > 0).first()
+            db.session.add(CartItem(student_id=student.student_id, class_id=class_ids[0]))
+            db.session.add(CartItem(student_id=student.student_id, class_id=over_limit_class.class_id))
+            db.session.commit()
+            credits_limit = Student.MAX_SEMESTER_CREDITS
+            Student.MAX_SEMESTER_CREDITS = sum(cart_class.credits_awarded for cart_class in cart_classes)
+            try:
+                results = student.register_cart_courses()
+            finally:
+                Student.MAX_SEMESTER_CREDITS = credits_limit
+            self.assertEqual(results, {class_ids[0]: Student.ALREADY_REGISTERED, over_limit_class.class_id: Student.OVER_CREDIT_LIMIT})
+            self.assertNotIn(over_limit_class.class_id, student.registered_classes)
+
+            # Restore the starting state
+            student.clear_cart()
+            Enrollment.query.filter_by(student_id=student.student_id).delete()
+            Transaction.query.filter_by(student=student.student_id).delete()
+            for class_id, class_seats in seats.items():
+                db.session.get(Class, class_id).available_seats = class_seats
+            db.session.commit()
+
+    def test_25_waiting_room(self):
+        """
+        Test 25 - Sessions over the admission limit wait in line, first come first served, and logging out frees a slot
+        """
+        max_active = app.config['ADMISSION_MAX_ACTIVE']
+        with app.app_context():
+            app.config['ADMISSION_MAX_ACTIVE'] = waiting_room.stats()['active'] + 1
+        try:
+            with app.app_context():
+                self.assertEqual(waiting_room.admit('first')[0], True)
+                self.assertEqual(waiting_room.admit('second')[:2], (False, 1))
+                self.assertEqual(waiting_room.admit('third')[:2], (False, 2))
+                waiting_room.release('first')
+                # The free slot goes to the front of the line
+                self.assertEqual(waiting_room.admit('third')[:2], (False, 2))
+                self.assertEqual(waiting_room.admit('second')[0], True)
+                self.assertEqual(waiting_room.admit('third')[:2], (False, 1))
+                waiting_room.release('second')
+                waiting_room.release('third')
+
+            # The last free slot goes to the first student; the second gets the queue page
+            self.login_with_password(self.username, self.password)
+            self.assertEqual(self.client.get('/courses').status_code, 200)
+            first_client = self.client
+            self.client = app.test_client()
+            self.login_with_password(self.username2, self.password2)
+            response = self.client.get('/courses')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], str(app.config['ADMISSION_RETRY_AFTER']))
+            self.assertIn(b'Your place in line', response.data)
+            # Pages outside the registration flow are not held back
+            self.assertEqual(self.client.get('/landing').status_code, 200)
+
+            first_client.get('/logout')
+            self.assertEqual(self.client.get('/courses').status_code, 200)
+        finally:
+            app.config['ADMISSION_MAX_ACTIVE'] = max_active
+
+    def test_26_dataset_generator(self):
+        """
+        Test 26 - Generated datasets are reproducible, respect prerequisites and never oversell a class
+        """
+        def generate(seed):
+            generator = DatasetGenerator(seed=seed, courses=150, students=300, first_year=2024, years=2)
+            semesters = generator.generate_semesters()
+            courses = generator.generate_courses([semester['semester_name'] for semester in semesters])
+            return courses, generator.generate_students(courses, semesters), generator
+
+        courses, students, generator = generate(7)
+        self.assertEqual((courses, students), generate(7)[:2])
+        self.assertNotEqual(students, generate(8)[1])
+        self.assertEqual(len(courses), 150)
+        self.assertEqual(len({(course['catalog'], course['course_number']) for course in courses}), 150)
+
+        classes = {class_key: (course_id, semester, max_seats) for semester, semester_classes in generator.get_classes(courses).items()
+                   for class_key, course_id, credits, max_seats in semester_classes}
+        prereqs = {f"{course['catalog']}{course['course_number']}": course['prereqs'] for course in courses}
+        semester_order = [semester['semester_name'] for semester in generator.generate_semesters()]
+        seats_taken = {}
+        for student in students:
+            taken = {}
+            for reference in student['registered_classes'] + student['cart']:
+                class_key = (reference['course_id'], reference['semester'], reference['location'], reference['professor'])
+                seats_taken[class_key] = seats_taken.get(class_key, 0) + 1
+                course_id, semester, max_seats = classes[class_key]
+                taken[course_id] = semester_order.index(semester)
+            # Every prerequisite was taken in an earlier semester
+            for course_id, semester_index in taken.items():
+                for prereq in prereqs[course_id]:
+                    self.assertLess(taken[prereq], semester_index)
+            self.assertNotIn('student', student['course_transactions'][0] if student['course_transactions'] else {})
+        self.assertTrue(all(seats <= classes[class_key][2] for class_key, seats in seats_taken.items()))
+
+        # Class references are resolved to the ids the database assigned, whatever order the classes were inserted in
+        data_path = Path(mkdtemp())
+        try:
+            DatasetGenerator(seed=7, courses=30, students=20, first_year=2024, years=2).write(data_path)
+            with open(data_path / 'initial_student_user_data.json') as student_file:
+                generated_students = load(student_file)
+            # A student left in an exported history is replaced by the ID assigned on import
+            for generated_student in generated_students:
+                for log_entry in generated_student['course_transactions']:
+                    log_entry['student'] = 1
+            with open(data_path / 'initial_student_user_data.json', 'w') as student_file:
+                dump(generated_students, student_file)
+            dataset_app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REDIS_URL': '', 'SESSION_BACKEND': 'memory',
+                                      'INIT_DATA_PATH': data_path, 'BCRYPT_LOG_ROUNDS': 4, 'PASSWORD_HASH_TARGET_TIME': None})
+            self.assertTrue(init_database(database_file_path, dataset_app, db, Course))
+            with dataset_app.app_context():
+                class_keys = {class_id: (course_id, semester, location, professor) for class_id, course_id, semester, location, professor
+                              in db.session.execute(select(Class.class_id, Class.course_id, Class.semester, Class.location, Class.professor))}
+                for generated_student in generated_students:
+                    student = Student.query.filter_by(student_email=generated_student['username']).one()
+                    enrolled = sorted(class_keys[enrollment.class_id] for enrollment in Enrollment.query.filter_by(student_id=student.student_id))
+                    self.assertEqual(enrolled, sorted(tuple(reference.values()) for reference in generated_student['registered_classes']))
+                    in_cart = {class_keys[item.class_id] for item in CartItem.query.filter_by(student_id=student.student_id)}
+                    waiting = {class_keys[entry.class_id] for entry in WaitlistEntry.query.filter_by(student_id=student.student_id)}
+                    self.assertEqual(in_cart | waiting, {tuple(reference.values()) for reference in generated_student['cart']})
+                self.assertTrue(db.session.scalar(select(Transaction.id).limit(1)))
+                self.assertFalse(db.session.scalar(select(Transaction.id).where(Transaction.student.not_in(select(Student.student_id))).limit(1)))
+                # Courses and their offering rows are bulk inserted
+                self.assertEqual(Course.query.count(), 30)
+                course = Course.query.first()
+                self.assertEqual(sorted(offering.semester for offering in course.course_semesters), sorted(course.semesters_offered))
+                self.assertEqual(sorted(prereq.prereq_id for prereq in course.course_prereqs), sorted(course.prereqs))
+        finally:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+    def test_27_bulk_seeding_helpers(self):
+        """
+        Test 27 - Bulk seeding hashes passwords in parallel and pre-allocates unique student IDs
+        """
+        passwords = [f"student{number}STUDENT!" for number in range(4)]
+        parallel_hash_min = User.PARALLEL_HASH_MIN
+        rounds, target_time = app.config['BCRYPT_LOG_ROUNDS'], app.config['PASSWORD_HASH_TARGET_TIME']
+        User.PARALLEL_HASH_MIN = 2
+        app.config['BCRYPT_LOG_ROUNDS'], app.config['PASSWORD_HASH_TARGET_TIME'] = 4, None
+        try:
+            with app.app_context():
+                password_hashes = User.hash_passwords(passwords)
+        finally:
+            User.PARALLEL_HASH_MIN = parallel_hash_min
+            app.config['BCRYPT_LOG_ROUNDS'], app.config['PASSWORD_HASH_TARGET_TIME'] = rounds, target_time
+        self.assertEqual(len(password_hashes), len(passwords))
+        for password, password_hash in zip(passwords, password_hashes):
+            self.assertTrue(password_hash.startswith('$2b$04$'))
+            self.assertTrue(bcrypt.check_password_hash(password_hash, password))
+
+        with app.app_context():
+            existing_ids = {student.student_id for student in Student.query.all()}
+            student_ids = Student.generate_student_ids(500)
+            self.assertEqual(len(set(student_ids)), 500)
+            self.assertFalse(existing_ids & set(student_ids))
+            self.assertTrue(all(10000000 <= student_id <= 99999999 for student_id in student_ids))
+
+    def test_28_password_hasher(self):
+        """
+        Test 28 - Passwords are hashed at the tuned cost, outdated hashes are upgraded at login, and logins and registrations are turned away when hashing is saturated
+        """
+        with app.app_context():
+            rounds = password_hasher.get_rounds()
+            self.assertGreaterEqual(rounds, app.config['PASSWORD_HASH_MIN_ROUNDS'])
+            self.assertLessEqual(rounds, app.config['PASSWORD_HASH_MAX_ROUNDS'])
+            password_hash = password_hasher.hash(self.password)
+            self.assertTrue(password_hash.startswith(f"$2b${rounds:02d}$"))
+            self.assertTrue(password_hasher.check(password_hash, self.password))
+            self.assertFalse(password_hasher.check(password_hash, self.wrong_password))
+        self.assertTrue(bcrypt.check_password_hash(password_hash, self.password))
+
+        # A cheap hash (e.g. seeded with --bcrypt-rounds 4) is replaced at the tuned cost on the next login
+        with app.app_context():
+            user = User.query.filter_by(username=self.username).first()
+            user.password = bcrypt.generate_password_hash(self.password, rounds=4).decode('utf-8')
+            db.session.commit()
+            self.assertTrue(password_hasher.needs_rehash(user.password))
+        self.login_with_password(self.username, self.password)
+        with app.app_context():
+            user = User.query.filter_by(username=self.username).first()
+            self.assertFalse(password_hasher.needs_rehash(user.password))
+            self.assertTrue(user.password.startswith(f"$2b${rounds:02d}$"))
+        self.client.get('/logout')
+
+        # Every hashing slot taken - the login is turned away instead of queueing forever
+        with app.app_context():
+            executor, slots = password_hasher.get_executor()
+        queue_timeout = app.config['PASSWORD_HASH_QUEUE_TIMEOUT']
+        app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = 0
+        taken_slots = 0
+        try:
+            while slots.acquire(blocking=False):
+                taken_slots += 1
+            with app.app_context():
+                self.assertIsNone(password_hasher.check(password_hash, self.password))
+                self.assertIsNone(password_hasher.hash(self.password))
+            response = self.client.post('/login', data={'username': self.username, 'password': self.password, 'csrf_token': self.get_csrf_token()})
+            self.assertEqual(response.status_code, 503)
+            response = self.client.post('/register', data={
+                'username': 'student98@student.umgc.edu', 'password': self.password, 'phone_number': self.phone_number,
+                'first_name': self.first_name, 'last_name': self.last_name, 'csrf_token': self.get_csrf_token()
+            })
+            self.assertEqual(response.status_code, 503)
+            with app.app_context():
+                self.assertIsNone(User.query.filter_by(username='student98@student.umgc.edu').first())
+        finally:
+            for slot in range(taken_slots):
+                slots.release()
+            app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = queue_timeout
+
+        # A server worker forked after the parent hashed starts its own pool instead of using the parent's fork server
+        with app.app_context():
+            self.assertTrue(password_hasher.check(password_hash, self.password))
+        pid = fork()
+        if pid == 0:
+            status = 1
+            try:
+                with app.app_context():
+                    if password_hasher.check(password_hash, self.password) and password_hasher.executor is not None:
+                        status = 0
+            finally:
+                app.extensions['ocr_app']['password_hasher'].shutdown()
+                _exit(status)
+        self.assertEqual(waitpid(pid, 0)[1], 0)
+
+        # serve() seeds and tunes in a child process and hands the cost to the workers
+        with app.app_context():
+            self.assertEqual(prepare_database(app), password_hasher.get_rounds())
+
+    def test_29_principal_cache(self):
+        """
+        Test 29 - Logged in pages load the user from the principal cache, and User / Student commits refresh it
+        """
+        statements = []
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        with app.app_context():
+            engines = list(db.engines.values())
+        def landing_auth_queries():
+            statements.clear()
+            for engine in engines:
+                event.listen(engine, 'before_cursor_execute', record_statement)
+            try:
+                response = self.client.get('/landing')
+            finally:
+                for engine in engines:
+                    event.remove(engine, 'before_cursor_execute', record_statement)
+            self.assertEqual(response.status_code, 200)
+            return response, [statement for statement in statements if 'FROM users' in statement or 'FROM students' in statement]
+
+        self.login_with_password(self.username, self.password)
+        landing_auth_queries()
+        response, auth_queries = landing_auth_queries()
+        self.assertEqual(auth_queries, [])
+        self.assertIn(b'Itsame Mario', response.data)
+
+        with app.app_context():
+            student = User.query.filter_by(username=self.username).first().student
+            student.first_name = 'itsnotme'
+            db.session.commit()
+        try:
+            response, auth_queries = landing_auth_queries()
+            self.assertIn(b'Itsnotme Mario', response.data)
+            self.assertEqual(len(auth_queries), 1)
+
+            # Redis unreachable - the snapshot is kept in this process instead
+            cache = app.extensions['ocr_app']['principal_cache']
+            retry_at = cache.retry_at
+            cache.retry_at = float('inf')
+            try:
+                landing_auth_queries()
+                response, auth_queries = landing_auth_queries()
+                self.assertEqual(auth_queries, [])
+            finally:
+                cache.retry_at = retry_at
+        finally:
+            with app.app_context():
+                User.query.filter_by(username=self.username).first().student.first_name = self.first_name.lower()
+                db.session.commit()
+
+    def test_30_database_engine_profile(self):
+        """
+        Test 30 - SQLite runs in WAL mode, and GETs of read-only pages are served by the read-only engine
+        """
+        with app.app_context():
+            primary = db.engine
+            read_only = db.engines['read_only']
+            with primary.connect() as connection:
+                self.assertEqual(connection.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+                self.assertEqual(connection.execute(text('PRAGMA synchronous')).scalar(), 1)
+                self.assertEqual(connection.execute(text('PRAGMA query_only')).scalar(), 0)
+            with read_only.connect() as connection:
+                self.assertEqual(connection.execute(text('PRAGMA query_only')).scalar(), 1)
+
+        used = {}
+        def record_engine(name):
+            def record_statement(conn, cursor, statement, parameters, context, executemany):
+                used.setdefault(name, []).append(statement)
+            return record_statement
+        listeners = [(primary, record_engine('primary')), (read_only, record_engine('read_only'))]
+        def requested_engines(method, url, **kwargs):
+            used.clear()
+            for engine, listener in listeners:
+                event.listen(engine, 'before_cursor_execute', listener)
+            try:
+                response = self.client.open(url, method=method, **kwargs)
+            finally:
+                for engine, listener in listeners:
+                    event.remove(engine, 'before_cursor_execute', listener)
+            self.assertIn(response.status_code, (200, 302))
+            return used
+
+        self.login_with_password(self.username, self.password)
+        engines = requested_engines('GET', '/log')
+        self.assertIn('read_only', engines)
+        self.assertNotIn('primary', engines)
+
+        # Writes always go to the primary
+        engines = requested_engines('POST', '/add_to_cart', data={'class_id': '76', 'csrf_token': self.csrf_token})
+        self.assertIn('primary', engines)
+        self.assertNotIn('read_only', engines)
+        self.client.post('/remove_from_cart', data={'class_id': '76', 'csrf_token': self.csrf_token})
+
+        # An in-memory database lives on one connection, so it gets no pool settings and its read-only engine is the primary
+        memory_app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REDIS_URL': '', 'SESSION_BACKEND': 'memory'})
+        with memory_app.app_context():
+            self.assertIs(db.engines['read_only'], db.engine)
+            db.create_all()
+            db.session.execute(text("INSERT INTO semesters (semester_name, start_date, end_date) VALUES ('Fall 2099', '2099-09-01', '2099-12-20')"))
+            db.session.commit()
+            with memory_app.test_request_context('/courses'):
+                g.read_only_database = True
+                self.assertEqual(db.session.query(Semester.semester_name).scalar(), 'Fall 2099')
+            # Each app has its own caches
+            self.assertIsNotNone(semester_calendar.get_dates('Fall 2099'))
+        with app.app_context():
+            self.assertIsNone(semester_calendar.get_dates('Fall 2099'))
+
+    @unittest.skipUnless(redis_available(app.config['SESSION_REDIS']), "needs a Redis server")
+    def test_31_session_store(self):
+        """
+        Test 31 - Unmodified sessions only refresh their expiry in Redis, and sessions keep working while Redis is down
+        """
+        redis = app.config['SESSION_REDIS']
+        store = FallbackRedisSessionInterface(app, redis, fallback_max_entries=10, key_prefix='ocr_app_test_session:')
+        lifetime = timedelta(minutes=5)
+        store_id = store._get_store_id('test31')
+        try:
+            session = store.session_class({'_user_id': '1'}, sid='test31', permanent=True)
+            session.modified = True
+            store._upsert_session(lifetime, session, store_id)
+            self.assertEqual(store._retrieve_session_data(store_id)['_user_id'], '1')
+
+            # Not modified - the stored payload is left alone
+            redis.expire(store_id, 10)
+            unchanged = store.session_class({'_user_id': '2'}, sid='test31', permanent=True)
+            unchanged.modified = False
+            store._upsert_session(lifetime, unchanged, store_id)
+            self.assertEqual(store._retrieve_session_data(store_id)['_user_id'], '1')
+            self.assertGreater(redis.ttl(store_id), 10)
+
+            # Redis unreachable - sessions are kept in this process
+            store.retry_at = float('inf')
+            session['_user_id'] = '3'
+            store._upsert_session(lifetime, session, store_id)
+            self.assertEqual(store._retrieve_session_data(store_id)['_user_id'], '3')
+            store._delete_session(store_id)
+            self.assertIsNone(store._retrieve_session_data(store_id))
+        finally:
+            store.retry_at = 0
+            store._delete_session(store_id)
+
+    def test_32_thread_pool_server(self):
+        """
+        Test 32 - The production server's worker serves requests on its thread pool and finishes them on shutdown
+        """
+        server = ThreadPoolWSGIServer('127.0.0.1', 0, app, threads=2)
+        serving = Thread(target=server.serve_forever, daemon=True)
+        serving.start()
+        try:
+            for attempt in range(3):
+                with urlopen(f'http://127.0.0.1:{server.port}/', timeout=10) as response:
+                    self.assertEqual(response.status, 200)
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.executor.shutdown(wait=True)
+        serving.join(timeout=10)
+        self.assertFalse(serving.is_alive())
+
+        # A busy worker leaves new connections in the listen backlog for the other workers sharing the socket
+        started, release = Event(), Event()
+        def wsgi_app(environ, start_response):
+            if environ['PATH_INFO'] == '/block':
+                started.set()
+                release.wait(10)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+        busy_server = ThreadPoolWSGIServer('127.0.0.1', 0, wsgi_app, threads=1)
+        other_server = ThreadPoolWSGIServer('127.0.0.1', busy_server.port, wsgi_app, threads=1, fd=dup(busy_server.socket.fileno()))
+        servers = [busy_server, other_server]
+        serving = [Thread(target=server.serve_forever, daemon=True) for server in servers]
+        blocked = Thread(target=lambda: urlopen(f'http://127.0.0.1:{busy_server.port}/block', timeout=20).read(), daemon=True)
+        try:
+            serving[0].start()
+            blocked.start()
+            self.assertTrue(started.wait(10))
+            serving[1].start()
+            for attempt in range(3):
+                with urlopen(f'http://127.0.0.1:{busy_server.port}/', timeout=5) as response:
+                    self.assertEqual(response.read(), b'ok')
+        finally:
+            release.set()
+            blocked.join(timeout=10)
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+                server.executor.shutdown(wait=True)
+
+    def test_33_query_profiler(self):
+        """
+        Test 33 - With profiling on, every response reports its SQL statement count, and statements repeated in a loop are flagged as N+1
+        """
+        # Off by default
+        self.login_with_password(self.username, self.password)
+        response = self.client.get('/log')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Query-Count', response.headers)
+
+        profiled_app = self.create_memory_app(QUERY_PROFILING_ENABLED=True, QUERY_N_PLUS_ONE_THRESHOLD=5)
+        with open(app.config['INIT_DATA_PATH'] / 'initial_student_user_data.json') as student_file:
+            seeded_student = load(student_file)[0]
+        self.client = profiled_app.test_client()
+        self.login_with_password(seeded_student['username'], seeded_student['password'])
+        response = self.client.get('/log')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response.headers['X-Query-Count']), 0)
+        self.assertIn('db;dur=', response.headers['Server-Timing'])
+
+        self.assertEqual(QueryProfiler.get_shape('SELECT name FROM classes\n WHERE class_id IN (?, ?,  ?)'), 'SELECT name FROM classes WHERE class_id IN (?)')
+
+        with profiled_app.test_request_context('/test-33'):
+            query_profiler.start()
+            class_ids = [class_id for (class_id,) in db.session.query(Class.class_id).limit(5).all()]
+            for class_id in class_ids:
+                db.session.get(Class, class_id)
+            summary = query_profiler.finish('test_33')
+            query_stats = query_profiler.stats()
+        self.assertEqual(summary['queries'], 6)
+        self.assertEqual(list(summary['n_plus_one'].values()), [5])
+        self.assertEqual(query_stats['process']['test_33']['n_plus_one'], 1)
+        self.assertGreaterEqual(query_stats['process']['views.registration_log']['requests'], 1)
+
+        # Route totals go to Redis at most once per QUERY_STATS_FLUSH_INTERVAL, not after every request
+        flush_interval = app.config['QUERY_STATS_FLUSH_INTERVAL']
+        app.config['QUERY_STATS_FLUSH_INTERVAL'] = 60
+        try:
+            with app.app_context():
+                profiler = QueryProfiler()
+                profiler.reset()
+                for request_number in range(3):
+                    profiler.record('test_33_buffered', {'queries': 2, 'time': 0.001, 'n_plus_one': {}})
+                # The first request flushed, the other two wait for the next flush
+                self.assertEqual(profiler.pending_routes['test_33_buffered']['requests'], 2)
+                query_stats = profiler.stats()
+                self.assertEqual(profiler.pending_routes, {})
+                self.assertEqual(query_stats['process']['test_33_buffered']['queries'], 6)
+                if 'total' in query_stats:
+                    self.assertEqual(query_stats['total']['test_33_buffered']['requests'], 3)
+        finally:
+            app.config['QUERY_STATS_FLUSH_INTERVAL'] = flush_interval
+
+    def test_34_cross_worker_invalidation(self):
+        """
+        Test 34 - In-process semester and facet copies are reloaded after a write made by another worker
+        """
+        with app.app_context():
+            check_interval, local_ttl = app.config['LOCAL_CACHE_CHECK_INTERVAL'], app.config['LOCAL_CACHE_TTL']
+            app.config['LOCAL_CACHE_CHECK_INTERVAL'] = 0
+            end_date = semester_calendar.get_dates('Fall 2025')[1]
+            course_facet_index.search({'semester': 'Fall 2099'})
+            def other_worker_write(statement):
+                # Raw SQL fires no ORM events in this process, like a commit in another worker, which bumps the shared versions
+                db.session.execute(text(statement))
+                db.session.commit()
+                if SharedVersion('semesters').bump() is None or SharedVersion('courses').bump() is None:
+                    # Without Redis the copies are reloaded by age instead
+                    app.config['LOCAL_CACHE_TTL'] = timedelta(0)
+            try:
+                other_worker_write("UPDATE semesters SET end_date = '2099-12-31' WHERE semester_name = 'Fall 2025'")
+                other_worker_write("INSERT INTO course_semester (course_id, semester) VALUES ('CMSC101', 'Fall 2099')")
+                self.assertEqual(semester_calendar.get_dates('Fall 2025')[1], date(2099, 12, 31))
+                self.assertEqual(course_facet_index.search({'semester': 'Fall 2099'})[0], ['CMSC101'])
+            finally:
+                other_worker_write(f"UPDATE semesters SET end_date = '{end_date.isoformat()}' WHERE semester_name = 'Fall 2025'")
+                other_worker_write("DELETE FROM course_semester WHERE course_id = 'CMSC101' AND semester = 'Fall 2099'")
+                self.assertEqual(semester_calendar.get_dates('Fall 2025')[1], end_date)
+                self.assertEqual(course_facet_index.search({'semester': 'Fall 2099'})[0], [])
+                app.config['LOCAL_CACHE_CHECK_INTERVAL'], app.config['LOCAL_CACHE_TTL'] = check_interval, local_ttl
+
+
+    def test_35_waitlist_seat_release(self):
+        """
+        Test 35 - A seat given back from a cart goes to the waitlist, and nobody takes an open seat ahead of the waitlist
+        """
+        with app.app_context():
+            waitlisted_class = Class.query.filter_by(course_id='CMSC101', semester='Fall 2025').first()
+            class_id, seats = waitlisted_class.class_id, waitlisted_class.available_seats
+            holder, waiting, late = [User.query.filter_by(username=f'student0{number}@student.umgc.edu').first().student for number in (5, 6, 7)]
+            try:
+                waitlisted_class.available_seats = 1
+                db.session.commit()
+                holder.add_course_to_cart(waitlisted_class)
+                self.assertEqual(holder.cart, [class_id])
+                waiting.add_course_to_cart(waitlisted_class)
+                self.assertEqual(WaitlistEntry.join(waiting.student_id, class_id), 1)
+
+                # Removing the held class promotes the waitlist in the same commit
+                self.assertTrue(holder.remove_class_from_cart(class_id))
+                db.session.commit()
+                self.assertIn(class_id, waiting.registered_classes)
+                self.assertEqual(WaitlistEntry.query.filter_by(class_id=class_id).count(), 0)
+                late.add_course_to_cart(waitlisted_class)
+                self.assertEqual(late.cart, [])
+                self.assertEqual(WaitlistEntry.join(late.student_id, class_id), 1)
+
+                # A seat added outside the app goes to the head of the line as soon as someone else asks for it
+                db.session.execute(update(Class).where(Class.class_id == class_id).values(available_seats=1))
+                db.session.commit()
+                holder.add_course_to_cart(waitlisted_class)
+                self.assertEqual(holder.cart, [])
+                self.assertIn(class_id, late.registered_classes)
+                self.assertIsNone(WaitlistEntry.query.filter_by(student_id=late.student_id, class_id=class_id).first())
+                self.assertEqual(WaitlistEntry.join(holder.student_id, class_id), 1)
+            finally:
+                for student in (holder, waiting, late):
+                    student.clear_cart()
+                    Enrollment.query.filter_by(student_id=student.student_id, class_id=class_id).delete()
+                    Transaction.query.filter_by(student=student.student_id, class_id=class_id).delete()
+                WaitlistEntry.query.filter_by(class_id=class_id).delete()
+                db.session.get(Class, class_id).available_seats = seats
+                db.session.commit()
+
+    def test_36_waitlist_one_section_per_course(self):
+        """
+        Test 36 - Students wait for one section of a course at a time, and promotion skips students with another section
+        """
+        with app.app_context():
+            first_section, second_section = Class.query.filter_by(course_id='CMSC101', semester='Fall 2025').order_by(Class.class_id).limit(2).all()
+            first_id, second_id = first_section.class_id, second_section.class_id
+            seats = {first_id: first_section.available_seats, second_id: second_section.available_seats}
+            student, other = [User.query.filter_by(username=f'student0{number}@student.umgc.edu').first().student for number in (8, 9)]
+            try:
+                first_section.available_seats, second_section.available_seats = 1, 0
+                db.session.commit()
+
+                # A seat in one section takes the student off the waitlist of the other
+                student.add_course_to_cart(second_section)
+                self.assertEqual(WaitlistEntry.join(student.student_id, second_id), 1)
+                student.add_course_to_cart(first_section)
+                self.assertIn(first_id, student.cart)
+                self.assertEqual(WaitlistEntry.query.filter_by(student_id=student.student_id).count(), 0)
+
+                # Promotion skips (and drops) a student with another section in their cart - the seat goes to the next in line
+                WaitlistEntry.join(student.student_id, second_id)
+                WaitlistEntry.join(other.student_id, second_id)
+                db.session.get(Class, second_id).available_seats = 1
+                db.session.commit()
+                self.assertNotIn(second_id, student.registered_classes)
+                self.assertIn(second_id, other.registered_classes)
+                self.assertEqual(WaitlistEntry.query.filter_by(class_id=second_id).count(), 0)
+                self.assertEqual(db.session.get(Class, second_id).available_seats, 0)
+
+                # Waiting for one full section rules out joining the waitlist of another
+                self.assertTrue(student.remove_class_from_cart(first_id))
+                db.session.get(Class, first_id).available_seats = 0
+                db.session.commit()
+                student.add_course_to_cart(first_section)
+                student.add_course_to_cart(second_section)
+                self.assertFalse({first_id, second_id} & set(student.cart))
+                self.assertEqual(db.session.scalars(select(WaitlistEntry.class_id).filter_by(student_id=student.student_id)).all(), [first_id])
+            finally:
+                for waiting_student in (student, other):
+                    CartItem.query.filter(CartItem.student_id == waiting_student.student_id, CartItem.class_id.in_([first_id, second_id])).delete(synchronize_session=False)
+                    Enrollment.query.filter(Enrollment.student_id == waiting_student.student_id, Enrollment.class_id.in_([first_id, second_id])).delete(synchronize_session=False)
+                    Transaction.query.filter(Transaction.student == waiting_student.student_id, Transaction.class_id.in_([first_id, second_id])).delete(synchronize_session=False)
+                WaitlistEntry.query.filter(WaitlistEntry.class_id.in_([first_id, second_id])).delete(synchronize_session=False)
+                db.session.get(Class, first_id).available_seats = seats[first_id]
+                db.session.get(Class, second_id).available_seats = seats[second_id]
+                db.session.commit()
+
 
 if __name__ == '__main__':
     unittest.main()